@@ -1,6 +1,7 @@
 from datetime import datetime
 
 import altair as alt
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -19,7 +20,8 @@ def get_import_price_series(profile: str, date_range: pd.DatetimeIndex, flat=Non
     if profile == "Flat":
         return get_flat_series(date_range, flat)
     elif profile == "Peak/Off-Peak":
-        return pd.Series([30 if t.hour in range(16,20) else 10 for t in date_range], index=date_range)
+        hours_arr = date_range.hour.to_numpy()
+        return pd.Series(np.where((hours_arr >= 16) & (hours_arr < 20), 30, 10), index=date_range)
 
 
 def get_export_price_series(profile: str, date_range: pd.DatetimeIndex, flat=None):
@@ -31,18 +33,87 @@ def get_demand_series(profile: str, date_range: pd.DatetimeIndex, flat=None):
     if profile == "Flat":
         return get_flat_series(date_range, flat)
     elif profile == "Evening Peak":
-        return pd.Series([2.0 if t.hour in range(17,21) else 0.5 for t in date_range], index=date_range)
+        hours_arr = date_range.hour.to_numpy()
+        return pd.Series(np.where((hours_arr >= 17) & (hours_arr < 21), 2.0, 0.5), index=date_range)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_schedule_charts(results: pd.DataFrame, soc_series: pd.Series, selected_flows: tuple):
+    # Returns the Vega-Lite spec rather than the Altair chart, so reruns with the
+    # same results and selection skip building and validating the chart again
+
+    # --- Plot schedule ---
+    step = results.index[1] - results.index[0]
+    timesteps = results.index.append(results.index[-1:] + step)
+
+    # Only melt selected flows, repeating each final value at the end time
+    # so the step-after line spans the last timestep
+    chart_data = results[list(selected_flows)].reindex(timesteps, method="ffill").reset_index(names="timestep").melt(
+        id_vars=["timestep"],
+        var_name="Power flow",
+        value_name="Power"
+    )
+
+    # Build chart
+    power_chart = (
+        alt.Chart(chart_data)
+        .mark_line(interpolate="step-after")
+        .encode(
+            x=alt.X("timestep:T", title="Time"),
+            y=alt.Y("Power:Q", title="Power (kW)"),
+            color=alt.Color(
+                'Power flow:N',
+                legend=alt.Legend(
+                    labelExpr="""
+                    {
+                      'charge': 'Charging battery',
+                      'discharge_home': 'Battery -> Home',
+                      'discharge_grid': 'Battery -> Grid',
+                      'grid_home': 'Grid -> Home'
+                    }[datum.label]
+                    """
+                )
+            )
+        )
+        .properties(title="Optimal power schedules", height=250)
+    )
+
+    # --- Plot SoC ---
+    soc_df = pd.DataFrame({
+        "timestep": timesteps,
+        "SoC_kWh": soc_series.values
+    })
+    soc_chart = (
+        alt.Chart(soc_df)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("timestep", title="Time"),
+            y=alt.Y("SoC_kWh", title="Energy (kWh)"),
+            color=alt.value("orange")
+        )
+        .properties(title="Battery energy level", height=200)
+    )
 
+    return alt.vconcat(power_chart, soc_chart).resolve_scale(x="shared").to_dict()
 
-hours = pd.date_range(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
-                           periods=24, freq="1h", tz="Europe/London")
-df = pd.DataFrame({
-    "import_price_p_per_kWh": get_import_price_series("Flat", hours),
-    "export_price_p_per_kWh": get_export_price_series("Flat", hours),
-    "power_demand": get_demand_series("Flat", hours),
-    "carbon_intensity_g_per_kWh": get_carbon_intensity(hours, 60)
-})
-df.index.name = "timestep"
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def get_initial_data(today: str):
+    # Cached per day, so the carbon intensity API is not hit on every rerun.
+    # The TTL matches the half-hourly refresh of the carbon intensity forecast.
+    hours = pd.date_range(today, periods=24, freq="1h", tz="Europe/London")
+    df = pd.DataFrame({
+        "import_price_p_per_kWh": get_import_price_series("Flat", hours),
+        "export_price_p_per_kWh": get_export_price_series("Flat", hours),
+        "power_demand": get_demand_series("Flat", hours),
+        "carbon_intensity_g_per_kWh": get_carbon_intensity(hours, 60)
+    })
+    df.index.name = "timestep"
+    return df
+
+
+df = get_initial_data(datetime.now().date().isoformat())
+hours = df.index
 
 st.set_page_config(
     page_title="Battery Optimizer",
@@ -121,8 +192,7 @@ with tab_input:
             df_uploaded = pd.read_csv(uploaded_file)
             expected_cols = ["import_price_p_per_kWh", "export_price_p_per_kWh", "power_demand"]
             if set(df_uploaded.columns) >= set(expected_cols) and len(df_uploaded) == 24:
-                for col in expected_cols:
-                    df[col] = df_uploaded[col].to_numpy()
+                df[expected_cols] = df_uploaded[expected_cols].to_numpy()
                 if "carbon_intensity_g_per_kWh" in df_uploaded.columns:
                     df["carbon_intensity_g_per_kWh"] = df_uploaded["carbon_intensity_g_per_kWh"].to_numpy()
                 st.success("CSV uploaded successfully. You may edit and re-download from the editor below.")
@@ -169,7 +239,6 @@ with tab_input:
             max_soc_kwh=max_soc_kwh,
             initial_soc_kwh=initial_soc_kwh,
             efficiency=efficiency,
-            power_demand=df["power_demand"].tolist(),
             min_final_soc_kwh=min_final_soc_kwh,
             max_final_soc_kwh=max_final_soc_kwh
         )
@@ -205,64 +274,8 @@ with tab_results:
                 default=st.session_state.get('selected_flows', ["charge"])
             )
 
-        # --- Plot schedule ---
-        t_final = results.index[len(results)-1] + (results.index[1] - results.index[0])
-        extra_row = results.iloc[[-1]].copy()
-        extra_row.index = [t_final]
-        results_ext = pd.concat([results, extra_row])
-
-        # Only keep selected flows
-        chart_data = results_ext.reset_index().melt(
-            id_vars=["index"],
-            value_vars=flows,
-            var_name="Power flow",
-            value_name="Power"
-        )
-        chart_data = chart_data[chart_data["Power flow"].isin(selected_flows)]
-
-        # Build chart
-        power_chart = (
-            alt.Chart(chart_data)
-            .mark_line(interpolate="step-after")
-            .encode(
-                x=alt.X("index:T", title="Time"),
-                y=alt.Y("Power:Q", title="Power (kW)"),
-                color=alt.Color(
-                    'Power flow:N',
-                    legend=alt.Legend(
-                        labelExpr="""
-                        {
-                          'charge': 'Charging battery',
-                          'discharge_home': 'Battery -> Home',
-                          'discharge_grid': 'Battery -> Grid',
-                          'grid_home': 'Grid -> Home'
-                        }[datum.label]
-                        """
-                    )
-                )
-            )
-            .properties(title="Optimal power schedules", height=250)
-        )
-
-        # --- Plot SoC ---
-        soc_series = st.session_state["soc"]
-        soc_df = pd.DataFrame({
-            "timestep": results_ext.index,
-            "SoC_kWh": soc_series.values
-        })
-        soc_chart = (
-            alt.Chart(soc_df)
-            .mark_line(point=True)
-            .encode(
-                x=alt.X("timestep", title="Time"),
-                y=alt.Y("SoC_kWh", title="Energy (kWh)"),
-                color=alt.value("orange")
-            )
-            .properties(title="Battery energy level", height=200)
-        )
-
-        charts = alt.vconcat(power_chart, soc_chart).resolve_scale(x="shared")
-        st.altair_chart(charts, use_container_width=True)
+        chart_spec = build_schedule_charts(results, st.session_state["soc"], tuple(selected_flows))
+        st.vega_lite_chart(chart_spec, use_container_width=True)
 
         # --- Download button ---
         csv = results.to_csv(index=True).encode("utf-8")
@@ -1,10 +1,18 @@
+import numpy as np
 import pandas as pd
 import pulp
 
+from battery_optimizer.timesteps import timestep_hours
+
+
+def _var_values(variables):
+    """Read the solved values of a list of LP variables into a float array."""
+    return np.fromiter((v.varValue for v in variables), dtype=np.float64, count=len(variables))
+
 
 def lp_schedule(df, mode, max_charge_kw, max_discharge_kw,
                 min_soc_kwh, max_soc_kwh, initial_soc_kwh,
-                efficiency, power_demand,
+                efficiency, power_demand = None,
                 min_final_soc_kwh = None, max_final_soc_kwh = None):
     """
     Compute optimal battery charging and discharging schedule with linear programming.
@@ -16,6 +24,7 @@ def lp_schedule(df, mode, max_charge_kw, max_discharge_kw,
             - 'import_price_p_per_kWh' if using 'cost' mode
             - 'export_price-p_per_kWh' if using 'cost' mode
             - 'carbon_intensity_g_per_kWh' if using 'carbon' mode
+            - 'power_demand' if `power_demand` is not given
     mode : str
         Optimization mode. Options:
             - 'cost': minimize electricity cost
@@ -35,9 +44,10 @@ def lp_schedule(df, mode, max_charge_kw, max_discharge_kw,
     efficiency : float
         Round-trip efficiency (0 < efficiency ≤ 1).
         Only applied on charging.
-    power_demand : list of float
+    power_demand : list of float, optional
         Power demand of the home at each timestep (kW).
         e.g. power_demand[i] is the power required between the ith and (i+1)th timestep.
+        May be set to None (default), in which case it is read from the 'power_demand' column of `df`.
     min_final_soc_kwh : float, optional
         The minimum state of charge at the end of the schedule (kWh).
         May be set to None (default), in which case the minimum final SoC is still constrained by `min_soc_kwh`.
@@ -48,21 +58,23 @@ def lp_schedule(df, mode, max_charge_kw, max_discharge_kw,
     Returns
     -------
     pd.DataFrame
-        DataFrame indexed by timestep with columns:
+        Copy of `df` indexed by timestep, with added columns:
         - charge: power from the grid to charge the battery (kW)
         - discharge_home: battery power sent to the home (kW)
         - discharge_grid: battery power sent to the grid (kW)
         - grid_home: power drawn directly from the grid to the home (kW)
     """
     n = len(df)
-    dt = (df.index[1] - df.index[0]).total_seconds() / 3600
+    dt = timestep_hours(df.index)
+    if power_demand is None:
+        power_demand = df["power_demand"].to_numpy()
 
     # Variables
-    charge = pulp.LpVariable.dicts("charge", range(n), lowBound=0, upBound=max_charge_kw)
-    discharge_home = pulp.LpVariable.dicts("discharge home", range(n), lowBound=0)
-    discharge_grid = pulp.LpVariable.dicts("discharge grid", range(n), lowBound=0)
-    grid_home = pulp.LpVariable.dicts("grid to home", range(n), lowBound=0)
-    soc = pulp.LpVariable.dicts("soc", range(n+1), lowBound=min_soc_kwh, upBound=max_soc_kwh)
+    charge = [pulp.LpVariable(f"charge_{t}", lowBound=0, upBound=max_charge_kw) for t in range(n)]
+    discharge_home = [pulp.LpVariable(f"discharge_home_{t}", lowBound=0) for t in range(n)]
+    discharge_grid = [pulp.LpVariable(f"discharge_grid_{t}", lowBound=0) for t in range(n)]
+    grid_home = [pulp.LpVariable(f"grid_to_home_{t}", lowBound=0) for t in range(n)]
+    soc = [pulp.LpVariable(f"soc_{t}", lowBound=min_soc_kwh, upBound=max_soc_kwh) for t in range(n+1)]
 
     # Problem
     prob = pulp.LpProblem("BatterySchedule", pulp.LpMinimize)
@@ -76,45 +88,50 @@ def lp_schedule(df, mode, max_charge_kw, max_discharge_kw,
     if max_final_soc_kwh is not None:
         prob += soc[n] <= max_final_soc_kwh
 
+    # Constraints are built directly from (variable, coefficient) pairs,
+    # which avoids creating intermediate expressions for every operator.
     for t in range(n):
         # SoC is equal to previous SoC after charging and discharging
-        prob += soc[t+1] == soc[t] + dt * (efficiency * charge[t] - discharge_home[t] - discharge_grid[t])
+        prob += pulp.LpAffineExpression([
+            (soc[t+1], 1), (soc[t], -1), (charge[t], -dt * efficiency),
+            (discharge_home[t], dt), (discharge_grid[t], dt)
+        ]) == 0
         # power to home must equal the demand
-        prob += discharge_home[t] + grid_home[t] == power_demand[t]
+        prob += pulp.LpAffineExpression([(discharge_home[t], 1), (grid_home[t], 1)]) == power_demand[t]
         # battery cannot discharge more than its limit
-        prob += discharge_home[t] + discharge_grid[t] <= max_discharge_kw
+        prob += pulp.LpAffineExpression([(discharge_home[t], 1), (discharge_grid[t], 1)]) <= max_discharge_kw
 
     # Objective functions
     if mode == "cost":
-        prob += pulp.lpSum([
-            dt * (charge[t] + grid_home[t]) * df["import_price_p_per_kWh"].iloc[t]
-            - dt * discharge_grid[t] * df["export_price_p_per_kWh"].iloc[t]
-            for t in range(n)
-        ])
+        import_cost = (dt * df["import_price_p_per_kWh"].to_numpy()).tolist()
+        export_cost = (-dt * df["export_price_p_per_kWh"].to_numpy()).tolist()
+        prob += pulp.LpAffineExpression(
+            list(zip(charge, import_cost))
+            + list(zip(grid_home, import_cost))
+            + list(zip(discharge_grid, export_cost))
+        )
     elif mode == "carbon":
-        prob += pulp.lpSum([
-            dt * (charge[t] + grid_home[t]) * df["carbon_intensity_g_per_kWh"].iloc[t]
-            for t in range(n)
-        ])
+        carbon = (dt * df["carbon_intensity_g_per_kWh"].to_numpy()).tolist()
+        prob += pulp.LpAffineExpression(list(zip(charge, carbon)) + list(zip(grid_home, carbon)))
 
-    # Solve
-    prob.solve()
+    # Solve in-process with HiGHS, falling back to PuLP's bundled CBC
+    solver = pulp.HiGHS(msg=False)
+    if not solver.available():
+        solver = pulp.PULP_CBC_CMD(msg=False)
+    prob.solve(solver)
     status = pulp.LpStatus[prob.status]
     print("LP status:", status)
     print("Objective value:", pulp.value(prob.objective))
 
-    soc_series = pd.Series(
-        [pulp.value(soc[t]) for t in range(n+1)],
-        name="SoC"
-    )
-
-    # Convert results to df
-    results_df = pd.DataFrame({
-        "charge": {t: pulp.value(charge[t]) for t in range(n)},
-        "discharge_home": {t: pulp.value(discharge_home[t]) for t in range(n)},
-        "discharge_grid": {t: pulp.value(discharge_grid[t]) for t in range(n)},
-        "grid_home": {t: pulp.value(grid_home[t]) for t in range(n)},
-    })
-    results_df.index = df.index
-    results_df.index.name = "timestep"
-    return status, soc_series, pd.concat([df, results_df], axis=1)
+    soc_series = pd.Series(_var_values(soc), name="SoC")
+
+    # Add results to a copy of the input data
+    out = df.copy()
+    out[["charge", "discharge_home", "discharge_grid", "grid_home"]] = np.column_stack([
+        _var_values(charge),
+        _var_values(discharge_home),
+        _var_values(discharge_grid),
+        _var_values(grid_home),
+    ])
+    out.index = out.index.rename("timestep")
+    return status, soc_series, out
@@ -1,59 +1,71 @@
-from datetime import datetime, timedelta, UTC
+import threading
 
+import numpy as np
 import pandas as pd
 import requests
 
 
 CARBON_API_URL = "https://api.carbonintensity.org.uk/intensity/{from_dt}/{to_dt}"
+CARBON_API_TIMEOUT = 10  # seconds
+
+# One session per thread, so repeated requests reuse a connection without
+# sharing a requests.Session between Streamlit's script-runner threads
+_local = threading.local()
+
+
+def _get_session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
 
 # ---------------------------
 # BUILD HALF-HOURLY INDEX
 # ---------------------------
 
 def build_time_index(hours=48):
-    now = datetime.now(UTC)
-    # Round to nearest half hour
-    minute = 30 if now.minute >= 30 else 0
-    now = now.replace(minute=minute, second=0, microsecond=0)
-    end = now + timedelta(hours=hours)
-    return pd.date_range(start=now, end=end, freq="30min", tz="Europe/London")
+    # Round down to the half hour
+    now = pd.Timestamp.now(tz="UTC").floor("30min")
+    return pd.date_range(start=now, periods=hours * 2 + 1, freq="30min").tz_convert("Europe/London")
 
 # ---------------------------
 # PRICE MODELS
 # ---------------------------
 
 def get_flat_prices(index, flat_import_price):
-    return pd.Series([flat_import_price] * len(index), index=index)
+    return pd.Series(np.full(len(index), flat_import_price, dtype=np.float64), index=index)
 
 
 def get_tou_prices(index, tou_periods):
-    prices = []
-    for ts in index:
-        hour = ts.hour
-        for start, end, price in tou_periods:
-            if start <= hour < end:
-                prices.append(price)
-                break
-    return pd.Series(prices, index=index)
+    # Build an hourly price table; filling in reverse lets the first listed period win
+    table = np.full(24, np.nan)
+    for start, end, price in reversed(tou_periods):
+        table[start:end] = price
+    if np.isnan(table).any():
+        raise ValueError("TOU periods must cover every hour of the day")
+
+    dtype = np.asarray([price for _, _, price in tou_periods]).dtype
+    return pd.Series(table[index.hour].astype(dtype), index=index)
 
 
 def get_csv_prices(index, path):
     df = pd.read_csv(path)
 
-    # Convert 'time' column to timedelta since midnight
-    df["time"] = pd.to_timedelta(df["time"] + ":00")
-
-    # Create series to map times to prices
-    price_map = pd.Series(df["price"].values, index=df["time"])
+    # Convert 'time' column to minutes since midnight, sorted for searching
+    times = pd.to_datetime(df["time"], format="%H:%M")
+    df["minute"] = times.dt.hour * 60 + times.dt.minute
+    df = df.sort_values("minute")
+    csv_minutes = df["minute"].to_numpy()
+    prices = df["price"].to_numpy()
 
-    # Extract the time-of-day for each timestamp in the index
-    time_of_day = index - index.normalize()
+    # Extract the minute of the day for each timestamp in the index
+    minute_of_day = index.hour.to_numpy() * 60 + index.minute.to_numpy()
 
-    # Restore the original index with dates
-    price_series = price_map.reindex(time_of_day, method="nearest")
-    price_series.index = index
+    # Choose the nearest CSV time on either side, preferring the later one on ties
+    right = np.clip(np.searchsorted(csv_minutes, minute_of_day), 0, len(csv_minutes) - 1)
+    left = np.clip(right - 1, 0, None)
+    nearest = np.where(minute_of_day - csv_minutes[left] < csv_minutes[right] - minute_of_day, left, right)
 
-    return price_series
+    return pd.Series(prices[nearest], index=index)
 
 # ---------------------------
 # CARBON INTENSITY
@@ -63,15 +75,15 @@ def get_carbon_intensity(index, dt=30):
     index_utc = index.tz_convert("UTC")
 
     start_str = index_utc[1].strftime("%Y-%m-%dT%H:%MZ")
-    end_str = (index_utc.max() + pd.Timedelta(minutes=dt)).strftime("%Y-%m-%dT%H:%MZ")
+    end_str = (index_utc[-1] + pd.Timedelta(minutes=dt)).strftime("%Y-%m-%dT%H:%MZ")
 
     url = CARBON_API_URL.format(from_dt=start_str, to_dt=end_str)
-    r = requests.get(url)
+    r = _get_session().get(url, timeout=CARBON_API_TIMEOUT)
     data = r.json()["data"]
 
     ci_series = pd.Series(
-        {pd.to_datetime(d["from"], utc=True): d["intensity"]["forecast"]
-         for d in data}
+        np.array([d["intensity"]["forecast"] for d in data], dtype=np.float64),
+        index=pd.to_datetime([d["from"] for d in data], utc=True, format="%Y-%m-%dT%H:%MZ")
     )
     ci_series = ci_series.reindex(index_utc, method="nearest")
     ci_series.index = ci_series.index.tz_convert("Europe/London")
@@ -126,15 +138,15 @@ def prepare_data(
     else:
         raise ValueError("Unknown tariff type")
 
-    export_prices = pd.Series([flat_export_price] * len(idx), index=idx)
+    export_prices = pd.Series(np.full(len(idx), flat_export_price, dtype=np.float64), index=idx)
 
     # Carbon intensity
     carbon = get_carbon_intensity(idx)
 
-    # Combine into DataFrame
+    # Combine into DataFrame; all series share idx, so skip index alignment
     df = pd.DataFrame({
-        "import_price_p_per_kWh": import_prices,
-        "export_price_p_per_kWh": export_prices,
-        "carbon_intensity_g_per_kWh": carbon
-    })
+        "import_price_p_per_kWh": import_prices.to_numpy(),
+        "export_price_p_per_kWh": export_prices.to_numpy(),
+        "carbon_intensity_g_per_kWh": carbon.to_numpy()
+    }, index=idx)
     return df
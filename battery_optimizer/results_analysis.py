@@ -1,13 +1,25 @@
+import numpy as np
+
+from battery_optimizer.timesteps import timestep_hours
+
+
 def carbon_saved(df):
     """Calculate carbon saved (kg CO2) compared to no battery."""
-    dt = (df.index[1] - df.index[0]).total_seconds() / 3600
-    base_carbon = ((df["discharge_home"] + df["grid_home"]) * df["carbon_intensity_g_per_kWh"] * dt).sum()
-    carbon = ((df["charge"] + df["grid_home"]) * df["carbon_intensity_g_per_kWh"] * dt).sum()
-    return (base_carbon - carbon) / 1000
+    dt = timestep_hours(df.index)
+    charge = df["charge"].to_numpy()
+    discharge_home = df["discharge_home"].to_numpy()
+    carbon_intensity = df["carbon_intensity_g_per_kWh"].to_numpy()
+
+    # Without a battery, the home draws discharge_home from the grid instead
+    return np.dot(discharge_home - charge, carbon_intensity) * dt / 1000
 
 def money_saved(df):
     """Calculate money saved (pence) compared to no battery."""
-    dt = (df.index[1] - df.index[0]).total_seconds() / 3600
-    base_money = ((df["discharge_home"] + df["grid_home"]) * df["import_price_p_per_kWh"] * dt).sum()
-    money = (((df["charge"] + df["grid_home"]) * df["import_price_p_per_kWh"] - df["discharge_grid"] * df["export_price_p_per_kWh"]) * dt).sum()
-    return base_money - money
+    dt = timestep_hours(df.index)
+    charge = df["charge"].to_numpy()
+    discharge_home = df["discharge_home"].to_numpy()
+    discharge_grid = df["discharge_grid"].to_numpy()
+    import_price = df["import_price_p_per_kWh"].to_numpy()
+    export_price = df["export_price_p_per_kWh"].to_numpy()
+
+    return (np.dot(discharge_home - charge, import_price) + np.dot(discharge_grid, export_price)) * dt
@@ -0,0 +1,9 @@
+import pandas as pd
+
+
+def timestep_hours(index):
+    """Return the length of one timestep of a uniformly spaced DatetimeIndex (hours)."""
+    freq = getattr(index, "freq", None)
+    if isinstance(freq, pd.offsets.Tick):
+        return pd.Timedelta(freq).total_seconds() / 3600
+    return (index[1] - index[0]).total_seconds() / 3600
@@ -88,3 +88,21 @@ def test_random_lp_scheduler(seed):
         # SoC within bounds
         soc += (efficiency * c - d) * dt
         assert min_soc_kwh - 1e-6 <= soc <= max_soc_kwh + 1e-6
+
+
+def test_lp_scheduler_reads_power_demand_from_df():
+    hours = pd.date_range("2025-01-01", periods=8, freq="30min")
+    df = pd.DataFrame({
+        "import_price_p_per_kWh": [10, 10, 30, 30, 10, 10, 30, 30],
+        "export_price_p_per_kWh": [5] * 8,
+        "carbon_intensity_g_per_kWh": [200] * 8,
+        "power_demand": [0.5, 0.5, 2.0, 2.0, 0.5, 0.5, 2.0, 2.0],
+    }, index=hours)
+    args = (df, "cost", 3, 3, 0, 10, 5, 0.9)
+
+    _, _, from_df = lp_schedule(*args)
+    _, _, from_arg = lp_schedule(*args, df["power_demand"].tolist())
+
+    flows = ["charge", "discharge_home", "discharge_grid", "grid_home"]
+    np.testing.assert_allclose(from_df[flows].to_numpy(), from_arg[flows].to_numpy(), atol=1e-6)
+    assert np.all(from_df["discharge_home"] + from_df["grid_home"] >= df["power_demand"] - 1e-6)
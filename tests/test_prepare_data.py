@@ -1,6 +1,7 @@
 import pandas as pd
+import pytest
 
-from battery_optimizer.prepare_data import prepare_data
+from battery_optimizer.prepare_data import get_csv_prices, get_tou_prices, prepare_data
 
 
 def test_prepare_data():
@@ -21,3 +22,42 @@ def test_prepare_data():
 
     # Check export prices are all the same as config
     assert all(df["export_price_p_per_kWh"] == flat_export_price)
+
+
+def test_get_tou_prices():
+    index = pd.date_range("2025-01-01", periods=48, freq="30min", tz="Europe/London")
+    tou_periods = ((0, 6, 12), (6, 16, 30), (16, 19, 40), (19, 24, 25))
+
+    prices = get_tou_prices(index, tou_periods)
+
+    expected = [next(p for s, e, p in tou_periods if s <= ts.hour < e) for ts in index]
+    assert prices.index.equals(index)
+    assert prices.tolist() == expected
+
+
+def test_get_tou_prices_first_listed_period_wins():
+    index = pd.DatetimeIndex(["2025-01-01 00:00", "2025-01-01 17:00", "2025-01-01 20:00"], tz="Europe/London")
+
+    prices = get_tou_prices(index, ((16, 19, 40), (0, 24, 10)))
+
+    assert prices.tolist() == [10, 40, 10]
+
+
+def test_get_tou_prices_rejects_gaps():
+    index = pd.date_range("2025-01-01", periods=48, freq="30min", tz="Europe/London")
+
+    with pytest.raises(ValueError):
+        get_tou_prices(index, ((0, 6, 12), (16, 24, 40)))
+
+
+def test_get_csv_prices_uses_nearest_time(tmp_path):
+    path = tmp_path / "prices.csv"
+    pd.DataFrame({"time": ["12:00", "00:00", "06:00"], "price": [30.0, 10.0, 20.0]}).to_csv(path, index=False)
+    index = pd.DatetimeIndex(
+        ["2025-01-01 02:00", "2025-01-01 03:00", "2025-01-01 05:59", "2025-01-01 23:30"], tz="Europe/London"
+    )
+
+    prices = get_csv_prices(index, path)
+
+    assert prices.index.equals(index)
+    assert prices.tolist() == [10.0, 20.0, 20.0, 30.0]
@@ -0,0 +1,14 @@
+import pandas as pd
+
+from battery_optimizer.timesteps import timestep_hours
+
+
+def test_timestep_hours_from_freq():
+    index = pd.date_range("2025-01-01", periods=4, freq="30min", tz="Europe/London")
+    assert timestep_hours(index) == 0.5
+
+
+def test_timestep_hours_without_freq():
+    index = pd.DatetimeIndex(["2025-01-01 00:00", "2025-01-01 01:00", "2025-01-01 02:00"])
+    assert index.freq is None
+    assert timestep_hours(index) == 1.0